@@ -18,44 +18,158 @@ Usage:
     # Dry run (just show what would be processed)
     python prompts/scripts/refactor_clojure.py src/laser_show/views/ --dry-run
 
+    # Pack up to 5 small files into each request
+    python prompts/scripts/refactor_clojure.py src/laser_show/css/ --pack 5
+
+    # Refactor a large tree with one batch inference job (at least 100 files)
+    python prompts/scripts/refactor_clojure.py src/ -r --batch \\
+        --batch-s3-uri s3://my-bucket/refactor/ \\
+        --batch-role-arn arn:aws:iam::123456789012:role/BedrockBatchRole
+
+    # Force fresh responses for every file, even unchanged ones
+    python prompts/scripts/refactor_clojure.py src/laser_show/views/ --force --no-cache
+
 Environment Variables:
     AWS_PROFILE - AWS profile to use (optional, uses default if not set)
     AWS_REGION - AWS region (default: us-east-1)
 """
 
 import argparse
+import functools
+import hashlib
 import json
 import os
-import re
 import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
-import boto3
-from botocore.config import Config
+try:
+    import orjson
+except ImportError:  # Optional speedup, falls back to the stdlib json module
+    orjson = None
 
 
 # Configuration
-DEFAULT_MODEL_ID = "anthropic.claude-opus-4-5-20251101-v1:0"
+# Cross-region inference profile: Bedrock routes requests across US regions,
+# so throughput isn't capped by a single region's quota
+DEFAULT_MODEL_ID = "us.anthropic.claude-opus-4-5-20251101-v1:0"
 DEFAULT_REGION = "us-east-1"
 MAX_TOKENS = 16384
 
+# Output budget estimate: refactored code is about as long as the source,
+# at roughly 3 chars per token, plus headroom for the changes summary
+CHARS_PER_TOKEN = 3
+SUMMARY_TOKENS = 1024
+
 # Path relative to this script's location
 SCRIPT_DIR = Path(__file__).parent
 PROMPT_TEMPLATE_PATH = SCRIPT_DIR.parent / "refactor-clojure-file.md"
 
-# Rate limiting
-REQUESTS_PER_MINUTE = 10
-REQUEST_DELAY = 60.0 / REQUESTS_PER_MINUTE
+# Prompt template placeholders; a loaded template is pre-split around them
+FILE_PATH_PLACEHOLDER = "{{FILE_PATH}}"
+FILE_CONTENT_PLACEHOLDER = "{{FILE_CONTENT}}"
+PromptTemplate = tuple[str, str, str]
+
+# Prompt packing: several small files share one request. See pack_char_budget
+# for how the source of a packed group is capped.
+PACKED_OUTPUT_INSTRUCTIONS = """
+
+## Multiple Files
 
+This request contains {count} files. Refactor each one independently. For
+each file, in the order given, write a `### <path>` heading with the path
+exactly as given above, then the list of changes, then the complete
+refactored file as the last ```clojure code block under that heading. Do not
+use `### ` headings for anything else.
+"""
+PACKED_FILE_HEADING = "### "
+# Each packed file reserves SUMMARY_TOKENS of output, so beyond this many files
+# no room is left for code (see pack_char_budget)
+MAX_PACK_FILES = MAX_TOKENS // SUMMARY_TOKENS - 1
+
+# Markdown fences around the refactored code in the model's response
+CODE_FENCE_OPEN = "```clojure\n"
+CODE_FENCE_CLOSE = "```"
+
+# Concurrency and throttling. Bedrock throttling is handled by botocore's
+# adaptive retry mode, which backs off and rate-limits the client based on
+# throttling responses; --rpm adds an optional client-side cap on top.
+DEFAULT_WORKERS = 10
+READ_WORKERS = 4  # Threads prefetching source files for batch jobs
+MAX_RETRY_ATTEMPTS = 8
+
+# Batch inference (asynchronous S3-in / S3-out jobs)
+BATCH_MIN_RECORDS = 100  # Bedrock rejects smaller batch inference jobs
+BATCH_POLL_INTERVAL = 60.0
+BATCH_DONE_STATUSES = {"Completed", "PartiallyCompleted"}
+BATCH_FAILED_STATUSES = {"Failed", "Stopped", "Expired"}
+
+# Failed responses are dumped to disk in slices of this many characters
+DEBUG_WRITE_CHUNK_CHARS = 64 * 1024
+
+# Response cache, so unchanged inputs don't trigger a new Bedrock call
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "refactor_clojure"
+
+
+_log_lock = threading.Lock()
+
+
+def log(message: str):
+    """Print a whole line at once so output from worker threads doesn't interleave."""
+    with _log_lock:
+        print(message)
+
+
+class RateLimiter:
+    """Thread-safe limiter allowing at most N request starts per rolling minute."""
+
+    def __init__(self, requests_per_minute: int, window: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.window = window
+        self._starts = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until another request may start within the budget."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._starts and now - self._starts[0] >= self.window:
+                    self._starts.popleft()
+                if len(self._starts) < self.requests_per_minute:
+                    self._starts.append(now)
+                    return
+                wait = self.window - (now - self._starts[0])
+            time.sleep(wait)
+
+
+@functools.lru_cache(maxsize=4)
+def get_bedrock_client(
+    region: str,
+    profile: Optional[str] = None,
+    max_pool_connections: int = DEFAULT_WORKERS,
+):
+    """Create a Bedrock runtime client.
+
+    The connection pool is sized to the number of concurrent requests and TCP
+    keep-alive is enabled so sockets are reused across calls. Clients are
+    cached per (region, profile, pool size) so repeated callers share one
+    session; boto3 clients are safe to share between threads.
+    """
+    # Imported lazily so --help, --dry-run and early exits skip the boto3 import
+    import boto3
+    from botocore.config import Config
 
-def get_bedrock_client(region: str, profile: Optional[str] = None):
-    """Create a Bedrock runtime client."""
     config = Config(
-        retries={"max_attempts": 3, "mode": "adaptive"},
+        retries={"max_attempts": MAX_RETRY_ATTEMPTS, "mode": "adaptive"},
         read_timeout=300,
         connect_timeout=10,
+        max_pool_connections=max(10, max_pool_connections),
+        tcp_keepalive=True,
     )
 
     session_kwargs = {}
@@ -70,50 +184,168 @@ def get_bedrock_client(region: str, profile: Optional[str] = None):
     )
 
 
-def load_prompt_template(template_path: str) -> str:
-    """Load the prompt template from file."""
-    with open(template_path, "r", encoding="utf-8") as f:
-        return f.read()
+@functools.lru_cache(maxsize=8)
+def get_aws_client(service_name: str, region: str, profile: Optional[str] = None):
+    """Create a plain AWS client (e.g. "bedrock" or "s3") for batch jobs."""
+    import boto3
+    from botocore.config import Config
+
+    session_kwargs = {}
+    if profile:
+        session_kwargs["profile_name"] = profile
+
+    session = boto3.Session(**session_kwargs)
+    return session.client(
+        service_name,
+        region_name=region,
+        config=Config(
+            retries={"max_attempts": MAX_RETRY_ATTEMPTS, "mode": "adaptive"}
+        ),
+    )
+
+
+def json_dumps(obj) -> bytes:
+    """Serialize to UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
 
 
-def build_prompt(template: str, file_path: str, file_content: str) -> str:
-    """Build the full prompt by substituting placeholders."""
-    prompt = template.replace("{{FILE_PATH}}", file_path)
-    prompt = prompt.replace("{{FILE_CONTENT}}", file_content)
-    return prompt
+def json_loads(data):
+    """Parse JSON from bytes or str, using orjson when it is installed."""
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
-def extract_code_from_response(response_text: str) -> Optional[str]:
-    """Extract the Clojure code block from the LLM response."""
-    # Look for the last clojure code block (the refactored code)
-    pattern = r"```clojure\n(.*?)```"
-    matches = re.findall(pattern, response_text, re.DOTALL)
+def split_prompt_template(template: str) -> PromptTemplate:
+    """Split the template around its placeholders into (prefix, middle, suffix).
 
-    if matches:
-        # Return the last code block (should be the refactored code)
-        return matches[-1].strip()
+    Doing this once up front lets build_prompt join the pieces directly
+    instead of re-scanning the whole template for every file.
+    """
+    for placeholder in (FILE_PATH_PLACEHOLDER, FILE_CONTENT_PLACEHOLDER):
+        if template.count(placeholder) != 1:
+            raise ValueError(f"Template must contain {placeholder} exactly once")
 
-    return None
+    prefix, rest = template.split(FILE_PATH_PLACEHOLDER)
+    if FILE_CONTENT_PLACEHOLDER not in rest:
+        raise ValueError(
+            f"Template must place {FILE_CONTENT_PLACEHOLDER} "
+            f"after {FILE_PATH_PLACEHOLDER}"
+        )
+    middle, suffix = rest.split(FILE_CONTENT_PLACEHOLDER)
+    return prefix, middle, suffix
 
 
-def extract_changes_summary(response_text: str) -> str:
-    """Extract the summary of changes from the response."""
-    # Get text before the code block
-    parts = response_text.split("```clojure")
-    if parts:
-        return parts[0].strip()
-    return ""
+def load_prompt_template(template_path: Path) -> PromptTemplate:
+    """Load the prompt template from file, pre-split for build_prompt."""
+    return split_prompt_template(template_path.read_text(encoding="utf-8"))
 
 
-def call_bedrock(
-    client,
-    model_id: str,
-    prompt: str,
-    max_tokens: int = MAX_TOKENS,
-) -> str:
-    """Call AWS Bedrock with the given prompt."""
-    # Format for Claude on Bedrock
-    body = {
+def build_prompt(template: PromptTemplate, file_path: str, file_content: str) -> str:
+    """Build the full prompt by filling in the template placeholders."""
+    prefix, middle, suffix = template
+    return "".join((prefix, file_path, middle, file_content, suffix))
+
+
+def build_packed_prompt(template: PromptTemplate, files: list[tuple[str, str]]) -> str:
+    """Build one prompt asking for several (path, content) files to be refactored.
+
+    The template's file section, from the paragraph holding {{FILE_PATH}} to
+    the paragraph after {{FILE_CONTENT}}, is repeated once per file.
+    """
+    prefix, middle, suffix = template
+    head, _, section_lead = prefix.rpartition("\n\n")
+    section_close, _, tail = suffix.partition("\n\n")
+    sections = "\n\n".join(
+        "".join((section_lead, file_path, middle, file_content, section_close))
+        for file_path, file_content in files
+    )
+    instructions = PACKED_OUTPUT_INSTRUCTIONS.format(count=len(files))
+    return "".join((head, "\n\n", sections, "\n\n", tail.rstrip(), instructions))
+
+
+def parse_response(response_text: str) -> tuple[str, Optional[str]]:
+    """Split the LLM response into (changes summary, refactored code).
+
+    Only the last clojure code block matters (the refactored code), so its
+    fences are located directly and the text before it becomes the summary.
+    The code is None if no complete block was found. The single rfind doubles
+    as the "is there any code at all" check, so no separate scan is needed.
+    """
+    start = response_text.rfind(CODE_FENCE_OPEN)
+    if start < 0:
+        return response_text.strip(), None
+
+    summary = response_text[:start].strip()
+    code_start = start + len(CODE_FENCE_OPEN)
+    end = response_text.find(CODE_FENCE_CLOSE, code_start)
+    if end < 0:
+        return summary, None
+
+    return summary, response_text[code_start:end].strip()
+
+
+def parse_packed_response(
+    response_text: str, file_paths: list[str]
+) -> Optional[list[tuple[str, Optional[str]]]]:
+    """Split a packed response into one (summary, code) pair per file.
+
+    The response is split on its `### <path>` headings and each section is
+    parsed like a single-file response, so clojure snippets in a summary are
+    never mistaken for another file's code. Returns None unless the headings
+    name exactly file_paths, in order.
+    """
+    sections = ("\n" + response_text).split("\n" + PACKED_FILE_HEADING)[1:]
+
+    results = []
+    headings = []
+    for section in sections:
+        heading, _, body = section.partition("\n")
+        headings.append(heading.strip().strip("`").strip())
+        results.append(parse_response(body))
+
+    if headings != file_paths:
+        return None
+    return results
+
+
+def response_cache_key(model_id: str, prompt: str) -> str:
+    """Content-address a request by model and fully rendered prompt.
+
+    The prompt already contains the template, file path and file content, so
+    any change to those (or the model) produces a new key.
+    """
+    digest = hashlib.sha256()
+    digest.update(model_id.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_cached_response(cache_dir: Path, key: str) -> Optional[str]:
+    """Return a previously stored response text, or None on cache miss."""
+    cache_path = cache_dir / f"{key}.json"
+    try:
+        return json_loads(cache_path.read_bytes())["response"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def save_cached_response(cache_dir: Path, key: str, model_id: str, response: str):
+    """Store a response text under its cache key."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = cache_dir / f"{key}.json"
+    # Write to a temp file first so concurrent workers never read a partial entry
+    tmp_path = cache_path.with_suffix(f".{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(json_dumps({"model_id": model_id, "response": response}))
+    os.replace(tmp_path, cache_path)
+
+
+def build_request_body(prompt: str, max_tokens: int = MAX_TOKENS) -> dict:
+    """Build the Claude-on-Bedrock request body for a prompt."""
+    return {
         "anthropic_version": "bedrock-2023-05-31",
         "max_tokens": max_tokens,
         "messages": [
@@ -124,90 +356,721 @@ def call_bedrock(
         ],
     }
 
-    response = client.invoke_model(
+
+def call_bedrock(
+    client,
+    model_id: str,
+    prompt: str,
+    max_tokens: int = MAX_TOKENS,
+) -> tuple[str, Optional[str]]:
+    """Call AWS Bedrock with the given prompt, streaming the response text.
+
+    Returns (response text, stop reason).
+    """
+    body = build_request_body(prompt, max_tokens)
+
+    response = client.invoke_model_with_response_stream(
         modelId=model_id,
         contentType="application/json",
         accept="application/json",
-        body=json.dumps(body),
+        body=json_dumps(body),
     )
 
-    response_body = json.loads(response["body"].read())
-    return response_body["content"][0]["text"]
+    # Accumulate text deltas as they arrive instead of waiting for the full body
+    text_parts = []
+    stop_reason = None
+    for event in response["body"]:
+        chunk = event.get("chunk")
+        if not chunk:
+            continue
+        payload = json_loads(chunk["bytes"])
+        if payload.get("type") == "content_block_delta":
+            delta = payload["delta"]
+            if delta.get("type") == "text_delta":
+                text_parts.append(delta["text"])
+        elif payload.get("type") == "message_delta":
+            stop_reason = payload["delta"].get("stop_reason", stop_reason)
+
+    return "".join(text_parts), stop_reason
+
+
+def estimate_max_tokens(source_chars: int, file_count: int = 1) -> int:
+    """Size the output budget to the source instead of always using MAX_TOKENS."""
+    estimate = source_chars // CHARS_PER_TOKEN + SUMMARY_TOKENS * file_count
+    return min(MAX_TOKENS, estimate)
+
+
+def get_response(
+    client,
+    model_id: str,
+    prompt: str,
+    request_key: str,
+    label: str,
+    verbose: bool = False,
+    rate_limiter: Optional[RateLimiter] = None,
+    cache_dir: Optional[Path] = None,
+    max_tokens: int = MAX_TOKENS,
+) -> tuple[str, bool]:
+    """Return (response text, whether it came from the cache) for a prompt.
+
+    The response cache is checked before calling Bedrock; the caller decides
+    whether a fresh response is worth caching. A response cut off by a
+    reduced max_tokens budget is retried once with the full MAX_TOKENS.
+    """
+    if cache_dir:
+        response = load_cached_response(cache_dir, request_key)
+        if response is not None:
+            if verbose:
+                log(f"  Using cached response for {label}")
+            return response, True
+
+    if verbose:
+        log(f"  Calling Bedrock for {label} (max_tokens={max_tokens})...")
+
+    if rate_limiter:
+        rate_limiter.acquire()
+
+    response, stop_reason = call_bedrock(client, model_id, prompt, max_tokens)
+
+    if stop_reason == "max_tokens" and max_tokens < MAX_TOKENS:
+        log(
+            f"  Response for {label} hit max_tokens={max_tokens}, "
+            f"retrying with {MAX_TOKENS}"
+        )
+        if rate_limiter:
+            rate_limiter.acquire()
+        response, _ = call_bedrock(client, model_id, prompt, MAX_TOKENS)
+
+    return response, False
 
 
 def refactor_file(
     client,
     model_id: str,
-    template: str,
+    template: PromptTemplate,
     file_path: Path,
     output_dir: Path,
     verbose: bool = False,
+    rate_limiter: Optional[RateLimiter] = None,
+    cache_dir: Optional[Path] = None,
+    skip_unchanged: bool = True,
 ) -> bool:
-    """Refactor a single Clojure file."""
+    """Refactor a single Clojure file.
+
+    When skip_unchanged is set, files whose output was already produced from
+    the same model and prompt are skipped. When cache_dir is given, responses
+    are looked up there before calling Bedrock and stored there after a
+    successful extraction.
+    """
     try:
         # Read the file
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        content = file_path.read_text(encoding="utf-8")
 
         if verbose:
-            print(f"  Reading: {file_path} ({len(content)} chars)")
+            log(f"  Reading: {file_path} ({len(content)} chars)")
 
         # Build prompt
         prompt = build_prompt(template, str(file_path), content)
 
         if verbose:
-            print(f"  Prompt size: {len(prompt)} chars")
+            log(f"  Prompt size for {file_path}: {len(prompt)} chars")
+
+        request_key = response_cache_key(model_id, prompt)
+        if skip_unchanged and is_output_up_to_date(
+            get_output_path(file_path, output_dir), request_key
+        ):
+            log(f"  Skipping {file_path}: output is up to date")
+            return True
+
+        response, from_cache = get_response(
+            client,
+            model_id,
+            prompt,
+            request_key,
+            label=str(file_path),
+            verbose=verbose,
+            rate_limiter=rate_limiter,
+            cache_dir=cache_dir,
+            max_tokens=estimate_max_tokens(len(content)),
+        )
 
-        # Call Bedrock
-        if verbose:
-            print("  Calling Bedrock...")
-
-        response = call_bedrock(client, model_id, prompt)
-
-        # Extract code
-        refactored_code = extract_code_from_response(response)
-
-        if not refactored_code:
-            print(f"  WARNING: Could not extract code from response for {file_path}")
-            # Save the full response for debugging
-            debug_path = output_dir / f"{file_path.stem}_debug.txt"
-            with open(debug_path, "w", encoding="utf-8") as f:
-                f.write(response)
-            print(f"  Saved debug output to: {debug_path}")
-            return False
-
-        # Save refactored code
-        # Preserve directory structure in output
-        relative_path = file_path
-        if file_path.is_absolute():
-            try:
-                relative_path = file_path.relative_to(Path.cwd())
-            except ValueError:
-                relative_path = Path(file_path.name)
-
-        output_path = output_dir / relative_path
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(refactored_code)
-            f.write("\n")  # Ensure trailing newline
-
-        # Save changes summary
-        summary = extract_changes_summary(response)
-        if summary:
-            summary_path = output_path.with_suffix(".changes.md")
-            with open(summary_path, "w", encoding="utf-8") as f:
-                f.write(f"# Changes for {file_path}\n\n")
-                f.write(summary)
+        # Only cache usable responses so failed extractions are retried
+        success = save_refactor_result(
+            file_path, response, output_dir, verbose, request_key
+        )
+        if success and cache_dir and not from_cache:
+            save_cached_response(cache_dir, request_key, model_id, response)
+
+        return success
+
+    except Exception as e:
+        log(f"  ERROR processing {file_path}: {e}")
+        return False
+
+
+def refactor_packed_files(
+    client,
+    model_id: str,
+    template: PromptTemplate,
+    file_paths: list[Path],
+    output_dir: Path,
+    verbose: bool = False,
+    rate_limiter: Optional[RateLimiter] = None,
+    cache_dir: Optional[Path] = None,
+    skip_unchanged: bool = True,
+) -> list[bool]:
+    """Refactor several small Clojure files with one packed prompt.
+
+    Skipping and caching work as in refactor_file, keyed on the packed
+    prompt. Files whose code can't be extracted from the packed response fall
+    back to refactor_file. Returns one success flag per file, in order.
+    """
+    label = ", ".join(str(file_path) for file_path in file_paths)
+    try:
+        files = [
+            (str(file_path), file_path.read_text(encoding="utf-8"))
+            for file_path in file_paths
+        ]
+        prompt = build_packed_prompt(template, files)
 
         if verbose:
-            print(f"  Saved to: {output_path}")
+            log(
+                f"  Packed {len(files)} files ({label}), "
+                f"prompt size: {len(prompt)} chars"
+            )
+
+        # A file counts as up to date if it came from this packed request or,
+        # after a per-file fallback, from its own single-file request
+        request_key = response_cache_key(model_id, prompt)
+        single_keys = [
+            response_cache_key(model_id, build_prompt(template, path, content))
+            for path, content in files
+        ]
+        if skip_unchanged and all(
+            is_output_up_to_date(
+                get_output_path(file_path, output_dir), request_key, single_key
+            )
+            for file_path, single_key in zip(file_paths, single_keys)
+        ):
+            log(f"  Skipping {label}: outputs are up to date")
+            return [True] * len(file_paths)
+
+        response, from_cache = get_response(
+            client,
+            model_id,
+            prompt,
+            request_key,
+            label=label,
+            verbose=verbose,
+            rate_limiter=rate_limiter,
+            cache_dir=cache_dir,
+            max_tokens=estimate_max_tokens(
+                sum(len(content) for _, content in files), len(files)
+            ),
+        )
 
-        return True
+        def refactor_alone(file_path: Path) -> bool:
+            return refactor_file(
+                client=client,
+                model_id=model_id,
+                template=template,
+                file_path=file_path,
+                output_dir=output_dir,
+                verbose=verbose,
+                rate_limiter=rate_limiter,
+                cache_dir=cache_dir,
+                skip_unchanged=skip_unchanged,
+            )
+
+        results = parse_packed_response(
+            response, [str(file_path) for file_path in file_paths]
+        )
+        if results is None:
+            log(
+                f"  WARNING: Packed response headings don't match {label}; "
+                "retrying each file on its own"
+            )
+            debug_name = f"{file_paths[0].stem}+{len(file_paths) - 1}"
+            save_debug_output(output_dir, debug_name, response)
+            return [refactor_alone(file_path) for file_path in file_paths]
+
+        successes = []
+        for file_path, (summary, refactored_code) in zip(file_paths, results):
+            if not refactored_code:
+                log(
+                    f"  WARNING: Empty code block in response for {file_path}; "
+                    "retrying it on its own"
+                )
+                successes.append(refactor_alone(file_path))
+                continue
+            write_refactor_output(
+                file_path, summary, refactored_code, output_dir, verbose, request_key
+            )
+            successes.append(True)
+
+        # Only cache fully usable responses so failed extractions are retried
+        if all(successes) and cache_dir and not from_cache:
+            save_cached_response(cache_dir, request_key, model_id, response)
+
+        return successes
 
     except Exception as e:
-        print(f"  ERROR processing {file_path}: {e}")
+        log(f"  ERROR processing {label}: {e}")
+        return [False] * len(file_paths)
+
+
+def pack_char_budget(max_files: int) -> int:
+    """Source chars a packed group may hold and still fit its output budget.
+
+    Each file in the group needs SUMMARY_TOKENS on top of its code, so that
+    much is reserved per file before converting the rest of MAX_TOKENS back to
+    characters. Groups stay strictly under this, keeping their estimated
+    max_tokens below MAX_TOKENS so truncated responses can still be retried.
+    """
+    return (MAX_TOKENS - SUMMARY_TOKENS * max_files) * CHARS_PER_TOKEN
+
+
+def pack_files(
+    files: list[Path], max_files: int, max_chars: Optional[int] = None
+) -> list[list[Path]]:
+    """Greedily group files, in order, for packed prompts.
+
+    A group holds at most max_files files whose combined size stays below
+    max_chars (default: pack_char_budget(max_files)); larger files get a group
+    of their own. Sizes come from stat() so grouping doesn't need to read the
+    files.
+    """
+    if max_chars is None:
+        max_chars = pack_char_budget(max_files)
+
+    groups = []
+    group = []
+    group_size = 0
+    for file_path in files:
+        size = file_path.stat().st_size
+        if group and (len(group) >= max_files or group_size + size >= max_chars):
+            groups.append(group)
+            group = []
+            group_size = 0
+        group.append(file_path)
+        group_size += size
+    if group:
+        groups.append(group)
+    return groups
+
+
+def get_output_path(file_path: Path, output_dir: Path) -> Path:
+    """Map a source file to its output path, preserving directory structure."""
+    relative_path = file_path
+    if file_path.is_absolute():
+        try:
+            relative_path = file_path.relative_to(Path.cwd())
+        except ValueError:
+            relative_path = Path(file_path.name)
+
+    return output_dir / relative_path
+
+
+def source_hash_path(output_path: Path) -> Path:
+    """Sidecar recording which request produced an output, e.g. foo.clj.sha256."""
+    return output_path.with_name(output_path.name + ".sha256")
+
+
+def is_output_up_to_date(output_path: Path, *request_keys: str) -> bool:
+    """Check whether output_path was produced by any of the given requests."""
+    try:
+        recorded_key = source_hash_path(output_path).read_text(encoding="utf-8")
+    except OSError:
         return False
+    return recorded_key.strip() in request_keys and output_path.exists()
+
+
+def save_refactor_result(
+    file_path: Path,
+    response: str,
+    output_dir: Path,
+    verbose: bool = False,
+    request_key: Optional[str] = None,
+) -> bool:
+    """Extract the refactored code from a response and write it to output_dir."""
+    # Extract code and summary
+    summary, refactored_code = parse_response(response)
+
+    if not refactored_code:
+        log(f"  WARNING: Could not extract code from response for {file_path}")
+        save_debug_output(output_dir, file_path.stem, response)
+        return False
+
+    write_refactor_output(
+        file_path, summary, refactored_code, output_dir, verbose, request_key
+    )
+    return True
+
+
+def save_debug_output(output_dir: Path, name: str, response: str):
+    """Save a full response that code could not be extracted from as <name>_debug.txt.
+
+    The text is written in slices so only one slice at a time is held in its
+    encoded form, rather than a second full copy of the response.
+    """
+    debug_path = output_dir / f"{name}_debug.txt"
+    # Best effort: a failed debug dump must not stop the caller's fallback
+    try:
+        with open(debug_path, "w", encoding="utf-8") as f:
+            for start in range(0, len(response), DEBUG_WRITE_CHUNK_CHARS):
+                f.write(response[start : start + DEBUG_WRITE_CHUNK_CHARS])
+    except OSError as e:
+        log(f"  WARNING: Could not save debug output to {debug_path}: {e}")
+        return
+    log(f"  Saved debug output to: {debug_path}")
+
+
+def write_refactor_output(
+    file_path: Path,
+    summary: str,
+    refactored_code: str,
+    output_dir: Path,
+    verbose: bool = False,
+    request_key: Optional[str] = None,
+):
+    """Write refactored code and its changes summary for one source file.
+
+    If request_key is given it is recorded next to the output so unchanged
+    files can be skipped on the next run.
+    """
+    # Save refactored code
+    output_path = get_output_path(file_path, output_dir)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Ensure trailing newline
+    output_path.write_text(refactored_code + "\n", encoding="utf-8")
+
+    # Save changes summary
+    if summary:
+        summary_path = output_path.with_suffix(".changes.md")
+        summary_path.write_text(
+            f"# Changes for {file_path}\n\n{summary}", encoding="utf-8"
+        )
+
+    # Written last, so an interrupted write never marks the output up to date
+    if request_key:
+        source_hash_path(output_path).write_text(request_key, encoding="utf-8")
+
+    if verbose:
+        log(f"  Saved {file_path} to: {output_path}")
+
+
+def refactor_files_concurrently(
+    client,
+    model_id: str,
+    template: PromptTemplate,
+    files: list[Path],
+    output_dir: Path,
+    workers: int = DEFAULT_WORKERS,
+    verbose: bool = False,
+    cache_dir: Optional[Path] = None,
+    requests_per_minute: Optional[int] = None,
+    skip_unchanged: bool = True,
+    pack: int = 1,
+) -> tuple[int, int]:
+    """Refactor files with concurrent on-demand calls.
+
+    Throttling is left to botocore's adaptive retries unless
+    requests_per_minute sets an explicit client-side cap. With pack > 1,
+    up to that many small files share each request.
+
+    Returns (success count, error count).
+    """
+    rate_limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+    groups = pack_files(files, pack) if pack > 1 else [[path] for path in files]
+    if pack > 1 and len(files) > 1 and len(groups) == len(files):
+        log(
+            f"  WARNING: No files fit together within the --pack {pack} budget "
+            f"of {pack_char_budget(pack)} chars; sending one file per request"
+        )
+    worker_kwargs = dict(
+        client=client,
+        model_id=model_id,
+        template=template,
+        output_dir=output_dir,
+        verbose=verbose,
+        rate_limiter=rate_limiter,
+        cache_dir=cache_dir,
+        skip_unchanged=skip_unchanged,
+    )
+    success_count = 0
+    error_count = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for group in groups:
+            if len(group) == 1:
+                future = executor.submit(
+                    refactor_file, file_path=group[0], **worker_kwargs
+                )
+            else:
+                future = executor.submit(
+                    refactor_packed_files, file_paths=group, **worker_kwargs
+                )
+            futures[future] = group
+
+        try:
+            done = 0
+            for future in as_completed(futures):
+                group = futures[future]
+                results = future.result()
+                if len(group) == 1:
+                    results = [results]
+
+                for file_path, success in zip(group, results):
+                    done += 1
+                    status = "Done" if success else "Failed"
+                    log(f"[{done}/{len(files)}] {status}: {file_path}")
+
+                    if success:
+                        success_count += 1
+                    else:
+                        error_count += 1
+        except KeyboardInterrupt:
+            log("\nInterrupted - cancelling pending files...")
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    return success_count, error_count
+
+
+def split_s3_uri(uri: str) -> tuple[str, str]:
+    """Split "s3://bucket/some/prefix" into ("bucket", "some/prefix")."""
+    if not uri.startswith("s3://"):
+        raise ValueError(f"Not an S3 URI: {uri}")
+    bucket, _, prefix = uri[len("s3://"):].partition("/")
+    return bucket, prefix.strip("/")
+
+
+def run_batch_job(
+    region: str,
+    profile: Optional[str],
+    model_id: str,
+    role_arn: str,
+    s3_uri: str,
+    records: dict[str, tuple[Path, str]],
+    verbose: bool = False,
+) -> dict[str, str]:
+    """Run one Bedrock batch inference job over the given prompts.
+
+    records maps a record ID to (file path, prompt). The input JSONL is
+    uploaded under s3_uri, the job is polled until it finishes, and the
+    response text for every successful record is returned by record ID.
+    """
+    bedrock = get_aws_client("bedrock", region, profile)
+    s3 = get_aws_client("s3", region, profile)
+
+    job_name = f"refactor-clojure-{time.strftime('%Y%m%d-%H%M%S')}"
+    bucket, prefix = split_s3_uri(s3_uri)
+    job_prefix = f"{prefix}/{job_name}" if prefix else job_name
+    input_key = f"{job_prefix}/input.jsonl"
+
+    # Upload one JSONL line per file
+    lines = [
+        json_dumps({"recordId": record_id, "modelInput": build_request_body(prompt)})
+        for record_id, (_, prompt) in records.items()
+    ]
+    s3.put_object(
+        Bucket=bucket,
+        Key=input_key,
+        Body=b"\n".join(lines),
+    )
+    print(f"Uploaded {len(lines)} record(s) to s3://{bucket}/{input_key}")
+
+    job = bedrock.create_model_invocation_job(
+        jobName=job_name,
+        roleArn=role_arn,
+        modelId=model_id,
+        inputDataConfig={
+            "s3InputDataConfig": {
+                "s3Uri": f"s3://{bucket}/{input_key}",
+                "s3InputFormat": "JSONL",
+            }
+        },
+        outputDataConfig={
+            "s3OutputDataConfig": {"s3Uri": f"s3://{bucket}/{job_prefix}/output/"}
+        },
+    )
+    job_arn = job["jobArn"]
+    print(f"Submitted batch job: {job_arn}")
+
+    # Poll until the job reaches a terminal state
+    while True:
+        status = bedrock.get_model_invocation_job(jobIdentifier=job_arn)["status"]
+        if verbose:
+            print(f"  Batch job status: {status}")
+        if status in BATCH_DONE_STATUSES:
+            break
+        if status in BATCH_FAILED_STATUSES:
+            raise RuntimeError(f"Batch job {job_arn} ended with status {status}")
+        time.sleep(BATCH_POLL_INTERVAL)
+
+    # Output lands under <output prefix>/<job id>/<input file name>.out
+    job_id = job_arn.rsplit("/", 1)[-1]
+    output_key = f"{job_prefix}/output/{job_id}/input.jsonl.out"
+    output = s3.get_object(Bucket=bucket, Key=output_key)["Body"]
+
+    responses = {}
+    for line in output.iter_lines():
+        if not line:
+            continue
+        record = json_loads(line)
+        record_id = record.get("recordId")
+        model_output = record.get("modelOutput")
+        if record_id not in records or not model_output:
+            error = record.get("error", {}).get("errorMessage", "no model output")
+            print(f"  WARNING: Batch record {record_id} failed: {error}")
+            continue
+        responses[record_id] = model_output["content"][0]["text"]
+
+    return responses
+
+
+def _read_source(file_path: Path) -> tuple[Path, Optional[str], Optional[Exception]]:
+    """Read one source file, returning the error instead of raising it."""
+    try:
+        return file_path, file_path.read_text(encoding="utf-8"), None
+    except (OSError, UnicodeDecodeError) as e:
+        return file_path, None, e
+
+
+def read_sources(
+    files: list[Path], workers: int = READ_WORKERS
+) -> Iterator[tuple[Path, Optional[str], Optional[Exception]]]:
+    """Read files on a small thread pool, yielding (path, content, error) in order."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_read_source, files)
+
+
+def refactor_files_batch(
+    region: str,
+    profile: Optional[str],
+    model_id: str,
+    role_arn: str,
+    s3_uri: str,
+    template: PromptTemplate,
+    files: list[Path],
+    output_dir: Path,
+    verbose: bool = False,
+    cache_dir: Optional[Path] = None,
+    skip_unchanged: bool = True,
+) -> tuple[int, int, list[Path]]:
+    """Refactor files through a single Bedrock batch inference job.
+
+    Up-to-date outputs are skipped and cached responses are used directly.
+    If fewer than BATCH_MIN_RECORDS files still need a model call, no job is
+    submitted and those files are returned for on-demand processing instead.
+
+    Returns (success count, error count, files left to process).
+    """
+    success_count = 0
+    error_count = 0
+    records = {}
+
+    # Reads are prefetched on a small pool while prompts are built in order
+    for i, (file_path, content, error) in enumerate(read_sources(files)):
+        if error:
+            print(f"  ERROR processing {file_path}: {error}")
+            error_count += 1
+            continue
+
+        try:
+            prompt = build_prompt(template, str(file_path), content)
+            request_key = response_cache_key(model_id, prompt)
+
+            if skip_unchanged and is_output_up_to_date(
+                get_output_path(file_path, output_dir), request_key
+            ):
+                print(f"  Skipping {file_path}: output is up to date")
+                success_count += 1
+                continue
+
+            if cache_dir:
+                response = load_cached_response(cache_dir, request_key)
+                if response is not None:
+                    if save_refactor_result(
+                        file_path, response, output_dir, verbose, request_key
+                    ):
+                        success_count += 1
+                    else:
+                        error_count += 1
+                    continue
+        except Exception as e:
+            print(f"  ERROR processing {file_path}: {e}")
+            error_count += 1
+            continue
+
+        # Record IDs must be 11 alphanumeric characters
+        records[f"REC{i:08d}"] = (file_path, prompt)
+
+    if len(records) < BATCH_MIN_RECORDS:
+        print(
+            f"{len(records)} file(s) need a model call, below the batch minimum "
+            f"of {BATCH_MIN_RECORDS}; using on-demand calls instead"
+        )
+        return success_count, error_count, [path for path, _ in records.values()]
+
+    try:
+        responses = run_batch_job(
+            region=region,
+            profile=profile,
+            model_id=model_id,
+            role_arn=role_arn,
+            s3_uri=s3_uri,
+            records=records,
+            verbose=verbose,
+        )
+    except Exception as e:
+        print(f"  ERROR running batch job: {e}")
+        return success_count, error_count + len(records), []
+
+    # Errors are handled per record so one bad write doesn't lose the rest
+    # of a finished (and paid for) job
+    for record_id, (file_path, prompt) in records.items():
+        response = responses.get(record_id)
+        request_key = response_cache_key(model_id, prompt)
+        try:
+            success = response is not None and save_refactor_result(
+                file_path, response, output_dir, verbose, request_key
+            )
+            if success and cache_dir:
+                save_cached_response(cache_dir, request_key, model_id, response)
+        except Exception as e:
+            print(f"  ERROR processing {file_path}: {e}")
+            error_count += 1
+            continue
+
+        if success:
+            success_count += 1
+        else:
+            print(f"  Failed: {file_path}")
+            error_count += 1
+
+    return success_count, error_count, []
+
+
+def _scan_clojure_files(directory: str, recursive: bool) -> Iterator[Path]:
+    """Yield .clj files under directory using cached os.scandir entry data.
+
+    Unreadable directories are skipped, as Path.rglob does.
+    """
+    try:
+        entries = os.scandir(directory)
+    except PermissionError:
+        return
+
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from _scan_clojure_files(entry.path, recursive)
+            elif entry.name.endswith(".clj") and entry.is_file():
+                yield Path(entry.path)
 
 
 def find_clojure_files(path: Path, recursive: bool = False) -> list[Path]:
@@ -217,10 +1080,29 @@ def find_clojure_files(path: Path, recursive: bool = False) -> list[Path]:
             return [path]
         return []
 
-    if recursive:
-        return list(path.rglob("*.clj"))
-    else:
-        return list(path.glob("*.clj"))
+    return list(_scan_clojure_files(str(path), recursive))
+
+
+def positive_int(value: str) -> int:
+    """argparse type for options that must be a whole number of at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value!r}")
+    return number
+
+
+def pack_size(value: str) -> int:
+    """argparse type for --pack: a file count that still leaves room for code."""
+    number = positive_int(value)
+    if number > MAX_PACK_FILES:
+        raise argparse.ArgumentTypeError(
+            f"must be at most {MAX_PACK_FILES}, since each packed file reserves "
+            f"{SUMMARY_TOKENS} of the {MAX_TOKENS} output tokens"
+        )
+    return number
 
 
 def main():
@@ -258,10 +1140,73 @@ def main():
         action="store_true",
         help="Verbose output",
     )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=positive_int,
+        default=DEFAULT_WORKERS,
+        help=f"Number of files to process concurrently (default: {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=positive_int,
+        help=(
+            "Cap on Bedrock requests started per minute (default: no cap, "
+            "rely on adaptive retries to back off when throttled)"
+        ),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help=f"Directory for cached Bedrock responses (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call Bedrock, ignoring and not updating the response cache",
+    )
+    parser.add_argument(
+        "--pack",
+        type=pack_size,
+        default=1,
+        metavar="N",
+        help=(
+            f"Pack up to N (at most {MAX_PACK_FILES}) small files into each "
+            "on-demand request (combined source sized to fit the output "
+            "budget; default: 1)"
+        ),
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Reprocess files even if their output is already up to date",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help=(
+            "Submit all files as one Bedrock batch inference job instead of "
+            f"on-demand calls (needs at least {BATCH_MIN_RECORDS} files, "
+            "--batch-s3-uri and --batch-role-arn)"
+        ),
+    )
+    parser.add_argument(
+        "--batch-s3-uri",
+        help="S3 prefix for batch job input/output, e.g. s3://bucket/refactor/",
+    )
+    parser.add_argument(
+        "--batch-role-arn",
+        help="IAM service role Bedrock assumes to read and write the batch S3 prefix",
+    )
     parser.add_argument(
         "--model",
         default=DEFAULT_MODEL_ID,
-        help=f"Bedrock model ID (default: {DEFAULT_MODEL_ID})",
+        help=(
+            "Bedrock model ID or inference profile ID (default: "
+            f"{DEFAULT_MODEL_ID}, a US cross-region profile; use a matching "
+            "eu./apac. profile or a plain model ID for other regions)"
+        ),
     )
     parser.add_argument(
         "--region",
@@ -291,6 +1236,10 @@ def main():
         print(f"Error: Prompt template not found: {args.template}")
         sys.exit(1)
 
+    if args.batch and not (args.batch_s3_uri and args.batch_role_arn):
+        print("Error: --batch requires --batch-s3-uri and --batch-role-arn")
+        sys.exit(1)
+
     # Find files to process
     files = find_clojure_files(args.path, args.recursive)
 
@@ -307,7 +1256,11 @@ def main():
         sys.exit(0)
 
     # Load template
-    template = load_prompt_template(str(args.template))
+    try:
+        template = load_prompt_template(args.template)
+    except ValueError as e:
+        print(f"Error: Invalid prompt template {args.template}: {e}")
+        sys.exit(1)
     if args.verbose:
         print(f"Loaded template: {args.template}")
 
@@ -315,36 +1268,46 @@ def main():
     args.output.mkdir(parents=True, exist_ok=True)
     print(f"Output directory: {args.output}")
 
-    # Initialize Bedrock client
-    print(f"Connecting to AWS Bedrock ({args.region})...")
-    client = get_bedrock_client(args.region, args.profile)
-
-    # Process files
+    cache_dir = None if args.no_cache else args.cache_dir
     success_count = 0
     error_count = 0
+    pending = files
 
-    for i, file_path in enumerate(files, 1):
-        print(f"\n[{i}/{len(files)}] Processing: {file_path}")
-
-        success = refactor_file(
-            client=client,
+    if args.batch:
+        success_count, error_count, pending = refactor_files_batch(
+            region=args.region,
+            profile=args.profile,
             model_id=args.model,
+            role_arn=args.batch_role_arn,
+            s3_uri=args.batch_s3_uri,
             template=template,
-            file_path=file_path,
+            files=files,
             output_dir=args.output,
             verbose=args.verbose,
+            cache_dir=cache_dir,
+            skip_unchanged=not args.force,
         )
 
-        if success:
-            success_count += 1
-        else:
-            error_count += 1
+    if pending:
+        # Initialize Bedrock client
+        print(f"Connecting to AWS Bedrock ({args.region})...")
+        client = get_bedrock_client(args.region, args.profile, args.workers)
 
-        # Rate limiting between requests
-        if i < len(files):
-            if args.verbose:
-                print(f"  Waiting {REQUEST_DELAY:.1f}s (rate limiting)...")
-            time.sleep(REQUEST_DELAY)
+        on_demand_success, on_demand_errors = refactor_files_concurrently(
+            client=client,
+            model_id=args.model,
+            template=template,
+            files=pending,
+            output_dir=args.output,
+            workers=args.workers,
+            verbose=args.verbose,
+            cache_dir=cache_dir,
+            requests_per_minute=args.rpm,
+            skip_unchanged=not args.force,
+            pack=args.pack,
+        )
+        success_count += on_demand_success
+        error_count += on_demand_errors
 
     # Summary
     print(f"\n{'=' * 50}")